@@ -61,6 +61,13 @@ ICON_URLS = {
     "msql":  "https://cdn-icons-png.flaticon.com/128/15484/15484291.png"
 }
 
+# Workspaces offered on the editor home page
+EDITOR_LANGUAGES = [
+    "html", "react", "javascript", "python",
+    "java", "cpp", "c",
+    "ruby", "msql"
+]
+
 # -----------------------
 # Config
 # -----------------------
@@ -70,6 +77,226 @@ app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode="threading")
 
+# -----------------------
+# Operator profiling (sampling + slow request capture)
+# -----------------------
+# Disabled unless PROFILER_TOKEN is set. One daemon thread samples stacks via
+# sys._current_frames(), either for every worker thread during an explicit
+# window, or for in-flight requests/socket handlers so that the ones slower
+# than SLOW_REQUEST_MS keep their profile. Captures are kept in a ring buffer
+# and downloaded as collapsed stacks (flamegraph.pl / speedscope input).
+#
+# Under eventlet (render.yaml's worker class) the sampler is an unpatched OS
+# thread, so it still preempts CPU-bound handlers; requests are greenlets, so
+# an in-flight request is sampled from its greenlet's saved frame while it is
+# suspended and from the hub thread's frame while it runs. gevent is not
+# supported.
+import sys
+import time
+import uuid
+import hmac
+import functools
+import threading
+from collections import Counter, deque
+from flask import g
+
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", 0.01))
+PROFILE_MAX_SECONDS = 120
+PROFILE_RING_SIZE = int(os.getenv("PROFILE_RING_SIZE", 20))
+SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", 0)) if PROFILER_TOKEN else 0
+
+
+def _os_threading_module():
+    """The unpatched threading module when eventlet has monkey-patched it."""
+    if "eventlet" in sys.modules:
+        from eventlet import patcher
+        if patcher.is_monkey_patched("thread"):
+            return patcher.original("threading")
+    return threading
+
+
+_os_threading = _os_threading_module()
+GREEN_THREADS = _os_threading is not threading
+_gevent_monkey = sys.modules.get("gevent.monkey")
+PROFILER_SUPPORTED = not (_gevent_monkey and _gevent_monkey.is_module_patched("threading"))
+if PROFILER_TOKEN and not PROFILER_SUPPORTED:
+    print("Profiler disabled: gevent worker detected (use eventlet or a threaded worker)")
+    SLOW_REQUEST_MS = 0
+
+# Shared with the OS sampler thread, so these must be real (unpatched) primitives
+_profile_captures = deque(maxlen=PROFILE_RING_SIZE)
+_profile_lock = _os_threading.Lock()
+_profile_inflight = {}      # thread/greenlet ident -> {"greenlet", "thread", "stacks"}
+_profile_window = None      # active sampling window, see start_profile_window
+_profile_sampler = None
+_profile_wakeup = _os_threading.Event()   # set while there is anything to sample
+
+
+def _current_greenlet():
+    if not GREEN_THREADS:
+        return None
+    from greenlet import getcurrent
+    return getcurrent()
+
+
+def _inflight_frame(entry, frames):
+    glet = entry["greenlet"]
+    if glet is None:
+        return frames.get(entry["thread"])
+    if not glet:
+        return None  # not started yet or already finished
+    # gr_frame is only set while the greenlet is suspended; a running one is
+    # whatever the hub thread is executing right now
+    return glet.gr_frame or frames.get(entry["thread"])
+
+
+def _collapse_stack(frame):
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+def _new_capture(kind, name, started, stacks, samples):
+    return {
+        "id": uuid.uuid4().hex[:12],
+        "kind": kind,
+        "name": name,
+        "started_at": started,
+        "duration_ms": int((time.time() - started) * 1000),
+        "samples": samples,
+        "stacks": stacks
+    }
+
+
+def _profile_sampler_loop():
+    global _profile_window
+    me = _os_threading.get_ident()
+    while True:
+        _profile_wakeup.wait()  # parked while nothing is in flight
+        time.sleep(PROFILE_INTERVAL)
+        frames = sys._current_frames()
+        names = {t.ident: t.name for t in _os_threading.enumerate()} if _profile_window else {}
+
+        with _profile_lock:
+            for entry in _profile_inflight.values():
+                frame = _inflight_frame(entry, frames)
+                if frame is not None:
+                    entry["stacks"][_collapse_stack(frame)] += 1
+
+            window = _profile_window
+            if window is not None:
+                for ident, frame in frames.items():
+                    if ident != me:
+                        thread = names.get(ident, str(ident)).replace(";", ",")
+                        window["stacks"][f"{thread};{_collapse_stack(frame)}"] += 1
+                window["samples"] += 1
+
+                if time.time() >= window["until"]:
+                    _profile_captures.append(_new_capture(
+                        "window", window["name"], window["started"], window["stacks"], window["samples"]
+                    ))
+                    _profile_window = None
+
+            if not _profile_inflight and _profile_window is None:
+                _profile_wakeup.clear()
+
+
+def _ensure_profile_sampler():
+    global _profile_sampler
+    with _profile_lock:
+        if _profile_sampler is None:
+            _profile_sampler = _os_threading.Thread(target=_profile_sampler_loop, name="profile-sampler", daemon=True)
+            _profile_sampler.start()
+
+
+def start_profile_window(seconds):
+    """Samples all threads for `seconds`; returns False if one is running."""
+    global _profile_window
+    _ensure_profile_sampler()
+    with _profile_lock:
+        if _profile_window is not None:
+            return False
+        _profile_wakeup.set()
+        now = time.time()
+        _profile_window = {
+            "name": f"window {seconds}s",
+            "started": now,
+            "until": now + seconds,
+            "stacks": Counter(),
+            "samples": 0
+        }
+        return True
+
+
+def _profile_begin():
+    if not SLOW_REQUEST_MS:
+        return None
+    _ensure_profile_sampler()
+    with _profile_lock:
+        # threading.get_ident() is the greenlet's id under eventlet
+        _profile_inflight[threading.get_ident()] = {
+            "greenlet": _current_greenlet(),
+            "thread": _os_threading.get_ident(),
+            "stacks": Counter()
+        }
+        _profile_wakeup.set()
+    return time.time()
+
+
+def _profile_end(name, started):
+    if started is None:
+        return
+    with _profile_lock:
+        entry = _profile_inflight.pop(threading.get_ident(), None)
+        stacks = entry["stacks"] if entry is not None else None
+        if stacks is not None and (time.time() - started) * 1000 >= SLOW_REQUEST_MS:
+            _profile_captures.append(_new_capture(
+                "slow_request", name, started, stacks, sum(stacks.values())
+            ))
+
+
+@app.before_request
+def _profile_request_start():
+    g.profile_started = _profile_begin()
+
+
+@app.teardown_request
+def _profile_request_end(exc=None):
+    _profile_end(f"{request.method} {request.path}", g.pop("profile_started", None))
+
+
+def profiled_handler(event):
+    """Wraps a Socket.IO handler so slow invocations are captured too."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = _profile_begin()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _profile_end(f"socket {event}", started)
+        return wrapper
+    return decorator
+
+
+def operator_only(fn):
+    """Requires the X-Profiler-Token header to match PROFILER_TOKEN."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not PROFILER_TOKEN:
+            return jsonify({"error": "Not found"}), 404
+        # header only, so the token never lands in access logs; bytes because
+        # compare_digest rejects non-ASCII str
+        token = request.headers.get("X-Profiler-Token", "")
+        if not hmac.compare_digest(token.encode("utf-8"), PROFILER_TOKEN.encode("utf-8")):
+            return jsonify({"error": "Not allowed"}), 403
+        return fn(*args, **kwargs)
+    return wrapper
+
 # -----------------------
 # MongoDB
 # -----------------------
@@ -91,6 +318,538 @@ files_coll = db.files
 uploads_coll = db.uploads
 
 
+# -----------------------
+# Project Search Index (files + chat)
+# -----------------------
+import re
+import math
+from collections import OrderedDict, defaultdict
+
+SEARCH_TOKEN_RE = re.compile(r"[A-Za-z0-9_]+")
+SEARCH_MAX_LIMIT = 100
+SEARCH_MATCHES_PER_DOC = 5
+SEARCH_MAX_PROJECTS = int(os.getenv("SEARCH_MAX_PROJECTS", 32))
+
+_search_indexes = OrderedDict()   # project -> ProjectSearchIndex, LRU order
+_search_building = {}             # project -> {"pending": [updates], "done": Event}
+_search_indexes_lock = threading.Lock()
+
+
+def _search_tokens(text):
+    return [t.lower() for t in SEARCH_TOKEN_RE.findall(text or "")]
+
+
+class ProjectSearchIndex:
+    """
+    Inverted index for one project: token -> {doc_key: [line numbers]}.
+    Line 0 holds filename tokens so a hit on a name ranks the document too.
+    doc_key is ("file", language, filename) or ("message", message_id).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.postings = defaultdict(dict)
+        self.docs = {}
+
+    def add(self, key, name, text, meta):
+        lines = (text or "").split("\n")
+        with self.lock:
+            self._remove(key)
+            tokens = set()
+            for tok in set(_search_tokens(name)):
+                self.postings[tok][key] = [0]
+                tokens.add(tok)
+            for line_no, line in enumerate(lines, 1):
+                for tok in set(_search_tokens(line)):
+                    self.postings[tok].setdefault(key, []).append(line_no)
+                    tokens.add(tok)
+            self.docs[key] = {"name": name, "lines": lines, "meta": meta, "tokens": tokens}
+
+    def remove(self, key):
+        with self.lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        doc = self.docs.pop(key, None)
+        if not doc:
+            return
+        for tok in doc["tokens"]:
+            posting = self.postings.get(tok)
+            if posting is None:
+                continue
+            posting.pop(key, None)
+            if not posting:
+                del self.postings[tok]
+
+    def search(self, query, limit=20):
+        terms = list(dict.fromkeys(_search_tokens(query)))
+        if not terms:
+            return []
+
+        with self.lock:
+            postings = [self.postings.get(t) for t in terms]
+            if any(not p for p in postings):
+                return []
+
+            # Intersect starting from the rarest term so large projects only
+            # touch the documents that can actually match.
+            order = sorted(range(len(terms)), key=lambda i: len(postings[i]))
+            candidates = set(postings[order[0]])
+            for i in order[1:]:
+                candidates.intersection_update(postings[i])
+                if not candidates:
+                    return []
+
+            total = len(self.docs) or 1
+            scored = []
+            for key in candidates:
+                score = 0.0
+                line_hits = defaultdict(int)
+                for posting in postings:
+                    lines = posting[key]
+                    idf = math.log(1 + total / len(posting))
+                    score += (1 + math.log(len(lines))) * idf
+                    if lines[0] == 0:
+                        score += idf  # filename match
+                    for line_no in lines:
+                        line_hits[line_no] += 1
+                scored.append((score, key, line_hits))
+
+            scored.sort(key=lambda s: s[0], reverse=True)
+
+            results = []
+            for score, key, line_hits in scored[:limit]:
+                doc = self.docs[key]
+                best = sorted(line_hits.items(), key=lambda h: (-h[1], h[0]))[:SEARCH_MATCHES_PER_DOC]
+                matches = []
+                for line_no, _ in sorted(best):
+                    snippet = doc["name"] if line_no == 0 else doc["lines"][line_no - 1]
+                    matches.append({"line": line_no, "snippet": snippet.strip()[:200]})
+                hit = dict(doc["meta"])
+                hit["score"] = round(score, 4)
+                hit["matches"] = matches
+                results.append(hit)
+            return results
+
+
+def _search_index_file(index, project, lang, f):
+    filename = f.get("filename")
+    index.add(
+        ("file", lang, filename), filename, f.get("code", ""),
+        {"type": "file", "projectName": project, "language": lang, "filename": filename}
+    )
+
+
+def _search_index_message_doc(index, msg, content=None):
+    if msg.get("deleted"):
+        return
+    msg_id = str(msg["_id"])
+    filename = msg.get("filename")
+    name = "" if filename in (None, "(message only)") else filename
+    if content is None:
+        content = msg.get("code", "")
+    index.add(
+        ("message", msg_id), name, content,
+        {"type": "message", "projectName": msg.get("projectName"), "message_id": msg_id,
+         "sender": msg.get("sender"), "filename": filename}
+    )
+
+
+def _build_search_index(project):
+    index = ProjectSearchIndex()
+    for doc in files_coll.find({"projectName": project}):
+        for f in doc.get("files", []):
+            _search_index_file(index, project, doc["language"], f)
+    for msg in messages_coll.find({"projectName": project, "deleted": {"$ne": True}}):
+        # previews are truncated; index the full shared file instead
+        content = load_message_code(msg) if msg.get("code_truncated") else None
+        _search_index_message_doc(index, msg, content)
+    return index
+
+
+def get_search_index(project):
+    """
+    Returns the project's index, building it from Mongo on first use.
+    Updates that arrive while the build is running are queued and replayed
+    before the index is published; concurrent callers wait for that build.
+    """
+    with _search_indexes_lock:
+        index = _search_indexes.get(project)
+        if index is not None:
+            _search_indexes.move_to_end(project)
+            return index
+        build = _search_building.get(project)
+        owner = build is None
+        if owner:
+            build = _search_building[project] = {"pending": [], "done": threading.Event()}
+
+    if not owner:
+        build["done"].wait()
+        return get_search_index(project)
+
+    try:
+        index = _build_search_index(project)
+        with _search_indexes_lock:
+            for update in build["pending"]:
+                update(index)
+            _search_indexes[project] = index
+            while len(_search_indexes) > SEARCH_MAX_PROJECTS:
+                _search_indexes.popitem(last=False)
+        return index
+    finally:
+        with _search_indexes_lock:
+            _search_building.pop(project, None)
+        build["done"].set()
+
+
+def _search_apply(project, update):
+    # Only in-memory indexes are updated; unloaded projects are rebuilt from
+    # Mongo on their next query, and in-progress builds replay the update.
+    with _search_indexes_lock:
+        index = _search_indexes.get(project)
+        if index is None:
+            build = _search_building.get(project)
+            if build is not None:
+                build["pending"].append(update)
+            return
+    update(index)
+
+
+def search_update_file(project, lang, filename, code):
+    _search_apply(project, lambda index: _search_index_file(
+        index, project, lang, {"filename": filename, "code": code}))
+
+
+def search_remove_file(project, lang, filename):
+    _search_apply(project, lambda index: index.remove(("file", lang, filename)))
+
+
+def search_sync_language(project, lang, files):
+    def sync(index):
+        with index.lock:
+            stale = [k for k in index.docs if k[0] == "file" and k[1] == lang]
+        for key in stale:
+            index.remove(key)
+        for f in files:
+            _search_index_file(index, project, lang, f)
+    _search_apply(project, sync)
+
+
+def search_add_message(msg, content=None):
+    _search_apply(msg.get("projectName"), lambda index: _search_index_message_doc(index, msg, content))
+
+
+def search_remove_message(project, message_id):
+    _search_apply(project, lambda index: index.remove(("message", str(message_id))))
+
+
+# -----------------------
+# Chat message code previews
+# -----------------------
+# Messages only carry a bounded preview of a shared file; the full text lives
+# in uploads_coll and is fetched on demand via /api/messages/<id>/code.
+import hashlib
+
+MESSAGE_PREVIEW_LINES = 20
+MESSAGE_PREVIEW_MAX_CHARS = 2000
+MESSAGE_CODE_CACHE_BYTES = 16 * 1024 * 1024
+
+TEXT_FILE_EXTS = {'.txt', '.py', '.js', '.html', '.css', '.sql', '.rb', '.md', '.java', '.c', '.cpp'}
+
+EXT_LANGUAGES = {
+    ".py": "python", ".js": "javascript", ".html": "html", ".css": "css",
+    ".sql": "sql", ".rb": "ruby", ".md": "markdown", ".java": "java",
+    ".c": "c", ".cpp": "cpp", ".txt": "text"
+}
+
+_message_code_cache = OrderedDict()   # file_db_id -> text
+_message_code_cache_bytes = 0
+_message_code_cache_lock = threading.Lock()
+
+
+def build_code_preview(filename, content):
+    """Returns the message fields describing a shared text file."""
+    lines = content.split("\n")
+    preview = "\n".join(lines[:MESSAGE_PREVIEW_LINES])[:MESSAGE_PREVIEW_MAX_CHARS]
+    ext = os.path.splitext(filename or "")[1].lower()
+    return {
+        "code": preview,
+        "code_truncated": preview != content,
+        "code_lines": len(lines),
+        "code_size": len(content.encode("utf-8")),
+        "code_language": EXT_LANGUAGES.get(ext, "text"),
+        "code_hash": hashlib.sha256(content.encode("utf-8")).hexdigest()
+    }
+
+
+def _cache_message_code(file_db_id, text):
+    global _message_code_cache_bytes
+    size = len(text)
+    if size > MESSAGE_CODE_CACHE_BYTES // 4:
+        return
+    with _message_code_cache_lock:
+        if file_db_id in _message_code_cache:
+            _message_code_cache.move_to_end(file_db_id)
+            return
+        _message_code_cache[file_db_id] = text
+        _message_code_cache_bytes += size
+        while _message_code_cache_bytes > MESSAGE_CODE_CACHE_BYTES:
+            _, old = _message_code_cache.popitem(last=False)
+            _message_code_cache_bytes -= len(old)
+
+
+def load_message_code(msg):
+    """Full text of a message's shared file (falls back to the stored preview)."""
+    file_db_id = msg.get("file_db_id")
+    if not file_db_id:
+        return msg.get("code", "")
+
+    with _message_code_cache_lock:
+        text = _message_code_cache.get(file_db_id)
+        if text is not None:
+            _message_code_cache.move_to_end(file_db_id)
+            return text
+
+    try:
+        blob = uploads_coll.find_one({"_id": ObjectId(file_db_id)}, {"content": 1})
+    except Exception:
+        blob = None
+    if not blob:
+        return msg.get("code", "")
+
+    text = blob["content"].decode("utf-8", errors="replace")
+    _cache_message_code(file_db_id, text)
+    return text
+
+
+def backfill_message_previews():
+    """
+    Converts messages that still embed the whole file in `code` into the
+    preview form, moving the full text into uploads_coll when needed.
+    Safe to run repeatedly; only touches messages without a code_hash.
+    """
+    query = {
+        "code_hash": {"$exists": False},
+        "deleted": {"$ne": True},
+        "file_url": {"$ne": None},
+        "filename": {"$ne": "(message only)"}
+    }
+    converted = 0
+    for msg in messages_coll.find(query):
+        ext = os.path.splitext(msg.get("filename") or "")[1].lower()
+        content = msg.get("code") or ""
+        if ext not in TEXT_FILE_EXTS:
+            continue
+
+        fields = build_code_preview(msg["filename"], content)
+        if not msg.get("file_db_id"):
+            blob = uploads_coll.insert_one({
+                "projectName": msg.get("projectName"),
+                "sender": msg.get("sender"),
+                "original_name": msg["filename"],
+                "stored_name": (msg.get("file_url") or msg["filename"]).split("/uploads/", 1)[-1],
+                "content": content.encode("utf-8"),
+                "mimetype": msg.get("file_type") or "text/plain",
+                "filesize": fields["code_size"]
+            })
+            fields["file_db_id"] = str(blob.inserted_id)
+
+        messages_coll.update_one({"_id": msg["_id"]}, {"$set": fields})
+        converted += 1
+
+    if converted:
+        print(f"Backfilled code previews for {converted} messages")
+
+
+# -----------------------
+# Uploads disk tier (bounded cache in front of uploads_coll)
+# -----------------------
+# uploads/ only holds a working set: files live under uploads/<project>/,
+# recency is tracked in memory (and via mtime across restarts), and a sweeper
+# evicts least-recently-used files once UPLOADS_QUOTA_BYTES is exceeded.
+# Only files with a durable copy in uploads_coll are ever evicted; they are
+# written back on the next /uploads request. Files found without one (e.g.
+# legacy shares) are not looked up again for UPLOADS_SWEEP_INTERVAL.
+UPLOADS_QUOTA_BYTES = int(os.getenv("UPLOADS_QUOTA_BYTES", 256 * 1024 * 1024))
+UPLOADS_SWEEP_INTERVAL = int(os.getenv("UPLOADS_SWEEP_INTERVAL", 300))
+
+
+class UploadTier:
+    def __init__(self, root, quota):
+        self.root = os.path.abspath(root)
+        self.quota = quota
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()   # relative path -> size, oldest first
+        self.total = 0
+        self.last_sweep = None
+        self.sweeping = False
+        self.no_durable_copy = {}      # relative path -> time it was last looked up
+        os.makedirs(self.root, exist_ok=True)
+
+        existing = []
+        for d, _, files in os.walk(self.root):
+            for f in files:
+                path = os.path.join(d, f)
+                st = os.stat(path)
+                rel = os.path.relpath(path, self.root).replace(os.sep, "/")
+                existing.append((st.st_mtime, rel, st.st_size))
+        for _, rel, size in sorted(existing):
+            self.entries[rel] = size
+            self.total += size
+
+    def path(self, rel):
+        return os.path.join(self.root, *rel.split("/"))
+
+    def record(self, rel):
+        size = os.path.getsize(self.path(rel))
+        with self.lock:
+            self.total -= self.entries.pop(rel, 0)
+            self.entries[rel] = size
+            self.total += size
+            self.no_durable_copy.pop(rel, None)
+            over = self.total > self.quota and not self.sweeping
+        if over:
+            socketio.start_background_task(self.sweep)
+
+    def touch(self, rel):
+        with self.lock:
+            if rel not in self.entries:
+                return
+            self.entries.move_to_end(rel)
+        try:
+            os.utime(self.path(rel))
+        except OSError:
+            pass
+
+    def sweep(self):
+        """
+        Evicts LRU files until under quota; returns the sweep stats, or None
+        if another sweep is already running.
+        """
+        with self.lock:
+            if self.sweeping:
+                return None
+            self.sweeping = True
+            candidates = list(self.entries.items())
+        try:
+            reclaimed, evicted = self._evict(candidates)
+        finally:
+            with self.lock:
+                self.sweeping = False
+
+        with self.lock:
+            self.last_sweep = {
+                "at": time.time(),
+                "evicted": evicted,
+                "reclaimed_bytes": reclaimed,
+                "total_bytes": self.total,
+                "quota_bytes": self.quota,
+                "files": len(self.entries)
+            }
+            stats = dict(self.last_sweep)
+        if evicted:
+            print(f"Uploads sweep reclaimed {reclaimed} bytes ({evicted} files)")
+        return stats
+
+    def _evict(self, candidates):
+        reclaimed = 0
+        evicted = 0
+        for rel, size in candidates:
+            with self.lock:
+                if self.total <= self.quota:
+                    break
+                if rel not in self.entries:
+                    continue
+                checked = self.no_durable_copy.get(rel)
+                if checked is not None and time.time() - checked < UPLOADS_SWEEP_INTERVAL:
+                    continue
+            if not uploads_coll.find_one({"stored_name": rel}, {"_id": 1}):
+                # no durable copy; keep it on disk
+                with self.lock:
+                    if rel in self.entries:
+                        self.no_durable_copy[rel] = time.time()
+                continue
+            with self.lock:
+                if rel not in self.entries:
+                    continue
+                self.total -= self.entries.pop(rel)
+                self.no_durable_copy.pop(rel, None)
+            try:
+                os.remove(self.path(rel))
+            except OSError:
+                pass
+            reclaimed += size
+            evicted += 1
+        return reclaimed, evicted
+
+    def rehydrate(self, rel):
+        """Restores an evicted upload from uploads_coll; False if unknown."""
+        doc = uploads_coll.find_one({"stored_name": rel}, sort=[("_id", -1)])
+        if not doc:
+            return False
+        path = self.path(rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(doc["content"])
+        os.replace(tmp, path)
+        self.record(rel)
+        return True
+
+
+upload_tier = UploadTier(UPLOAD_FOLDER, UPLOADS_QUOTA_BYTES)
+
+
+def reserve_upload_path(project, filename):
+    """
+    Claims a unique uploads/<project>/<name> path (adding _1, _2 ... on
+    collisions) and returns (relative stored name, absolute path).
+    """
+    folder = secure_filename(project) or "_"
+    filename = secure_filename(filename) or "file"
+    os.makedirs(os.path.join(upload_tier.root, folder), exist_ok=True)
+
+    base, ext = os.path.splitext(filename)
+    counter = 0
+    while True:
+        name = filename if counter == 0 else f"{base}_{counter}{ext}"
+        rel = f"{folder}/{name}"
+        path = upload_tier.path(rel)
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return rel, path
+        except FileExistsError:
+            counter += 1
+
+
+def store_reserved_upload(stored_name, path, write):
+    """
+    Runs write(path) for a path from reserve_upload_path and records it in the
+    tier; on failure the empty placeholder is removed instead of leaking.
+    """
+    try:
+        write(path)
+    except BaseException:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        raise
+    upload_tier.record(stored_name)
+
+
+def uploads_sweeper():
+    # sweep() and rehydrate() look blobs up by stored_name
+    try:
+        uploads_coll.create_index("stored_name")
+    except Exception as e:
+        print("Uploads index creation failed:", e)
+    while True:
+        time.sleep(UPLOADS_SWEEP_INTERVAL)
+        try:
+            upload_tier.sweep()
+        except Exception as e:
+            print("Uploads sweep failed:", e)
 
 
 # -----------------------
@@ -228,6 +987,12 @@ def chatbot_page(projectName, usn):
 
 @app.route("/uploads/<path:filename>")
 def uploaded_file(filename):
+    if ".." in filename.split("/"):
+        return "File not found", 404
+    if os.path.isfile(upload_tier.path(filename)):
+        upload_tier.touch(filename)
+    elif not upload_tier.rehydrate(filename):
+        return "File not found", 404
     return send_from_directory(app.config["UPLOAD_FOLDER"], filename)
 
 @app.route("/send_message", methods=["POST"])
@@ -241,61 +1006,56 @@ def send_message():
     code_content = message
     file_url = None
     file_type = None
+    preview_fields = {}
 
     if file and file.filename:
-        filename = secure_filename(file.filename)
-        os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
-        path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-
+        stored_name, path = reserve_upload_path(projectName, file.filename)
+        filename = os.path.basename(stored_name)
         base, ext = os.path.splitext(filename)
-        counter = 1
-        while os.path.exists(path):
-            filename = f"{base}_{counter}{ext}"
-            path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-            counter += 1
 
-        file.save(path)
+        store_reserved_upload(stored_name, path, file.save)
         with open(path, "rb") as f:
             file_data = f.read()
+        mimetype = file.mimetype or mimetypes.guess_type(path)[0] or "application/octet-stream"
+        file_type = mimetype
         upload_doc = {
             "projectName": projectName,
             "sender": usn,
             "original_name": filename,
-            "stored_name": filename,
+            "stored_name": stored_name,
             "content": file_data,                 # store binary file
             "mimetype": file_type,
             "filesize": os.path.getsize(path)
         }
         file_db_record = uploads_coll.insert_one(upload_doc)
         file_db_id = str(file_db_record.inserted_id)
-        file_url = url_for("download_db_file", file_id=file_db_id)
-        mimetype = file.mimetype or mimetypes.guess_type(path)[0] or "application/octet-stream"
-        file_type = mimetype
-        file_url = url_for("uploaded_file", filename=filename)
+        file_url = url_for("uploaded_file", filename=stored_name)
 
-        text_exts = {'.txt', '.py', '.js', '.html', '.css', '.sql', '.rb', '.md', '.java', '.c', '.cpp'}
-        if ext.lower() in text_exts:
+        if ext.lower() in TEXT_FILE_EXTS:
             try:
-                with open(path, "r", encoding="utf-8") as f:
-                    code_content = f.read()
-            except:
+                code_content = file_data.decode("utf-8")
+            except UnicodeDecodeError:
                 code_content = message
-        else:
-            code_content = message
+            else:
+                _cache_message_code(file_db_id, code_content)
+                preview_fields = build_code_preview(filename, code_content)
 
     doc = {
         "sender": usn,
         "projectName": projectName,
         "filename": filename,
         "code": code_content,
-        "file_url": file_url,           # now DB-based URL
+        "file_url": file_url,
         "file_type": file_type,
         "file_db_id": file_db_id if file and file.filename else None,
         "deleted": False
     }
+    # shared text files only carry a preview; full text is served on demand
+    doc.update(preview_fields)
 
     inserted = messages_coll.insert_one(doc)
     doc["_id"] = str(inserted.inserted_id)
+    search_add_message(doc, code_content)
     socketio.emit("new_message", doc, room=f"{projectName}:__chat")
     return redirect(f"/chatbot/{projectName}/{usn}")
 
@@ -328,6 +1088,7 @@ def delete_message():
             "file_type": None
         }}
     )
+    search_remove_message(msg["projectName"], message_id)
     socketio.emit("message_deleted", {"_id": message_id}, room=f"{msg['projectName']}:__chat")
     return jsonify({"success": True})
 
@@ -336,16 +1097,11 @@ def delete_message():
 # -----------------------
 @app.route("/editor-home/<projectName>/<usn>")
 def editor_home(projectName, usn):
-    languages = [
-        "html", "react", "javascript", "python",
-        "java", "cpp", "c",
-        "ruby", "msql"
-    ]
     return render_template(
         "editor_home.html",
         projectName=projectName,
         usn=usn,
-        languages=languages,
+        languages=EDITOR_LANGUAGES,
         icons=ICON_URLS
     )
 
@@ -353,11 +1109,13 @@ def editor_home(projectName, usn):
 def editor(projectName, usn, language):
     doc = files_coll.find_one({"projectName": projectName, "language": language})
     if not doc:
+        starter = default_files_for_language(language)
         files_coll.insert_one({
             "projectName": projectName,
             "language": language,
-            "files": default_files_for_language(language)
+            "files": starter
         })
+        search_sync_language(projectName, language, starter)
     return render_template(
         "editor.html",
         projectName=projectName,
@@ -372,6 +1130,1113 @@ def api_files(projectName, language):
         return jsonify({"files": default_files_for_language(language)})
     return jsonify({"files": doc["files"]})
 
+# -----------------------
+# Project search
+# -----------------------
+@app.route("/api/search/<projectName>")
+def api_search(projectName):
+    """
+    Ranked search over the project's workspace files and chat messages.
+    ?q=<terms>&limit=<n>  — all terms must match (AND), results carry
+    line numbers and snippets (line 0 = filename match).
+    """
+    query = (request.args.get("q") or "").strip()
+    if not query:
+        return jsonify({"error": "Missing query"}), 400
+    try:
+        limit = max(1, min(int(request.args.get("limit", 20)), SEARCH_MAX_LIMIT))
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+
+    results = get_search_index(projectName).search(query, limit=limit)
+    return jsonify({"query": query, "results": results})
+
+# -----------------------
+# Local compile + run (C, C++, Java) with artifact cache
+# -----------------------
+# Opt-in: set LOCAL_COMPILE=1 on hosts that have gcc/g++/javac and bubblewrap
+# (bwrap). Compiled artifacts are cached on disk by sha256(source, compiler
+# version, flags), so re-running the same source (e.g. with new stdin) skips
+# the compile stage. Both stages run inside a bwrap sandbox.
+import glob
+import shutil
+import subprocess
+import tempfile
+from contextlib import contextmanager
+try:
+    import resource
+except ImportError:  # Windows dev machines
+    resource = None
+
+LOCAL_COMPILE_ENABLED = os.getenv("LOCAL_COMPILE", "0") == "1"
+COMPILE_CACHE_DIR = os.getenv("COMPILE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "code_collab_compile_cache"))
+COMPILE_CACHE_MAX_BYTES = int(os.getenv("COMPILE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+COMPILE_TIMEOUT = 30
+COMPILE_MEMORY_LIMIT = 1024 * 1024 * 1024
+RUN_TIMEOUT = 10
+RUN_MEMORY_LIMIT = 256 * 1024 * 1024
+RUN_OUTPUT_LIMIT = 1024 * 1024
+# RLIMIT_NPROC counts every process/thread of the sandbox uid. That is
+# RUN_SANDBOX_UID when the server runs as root (shared by concurrent runs),
+# otherwise the server's own user, so leave room for the web workers.
+RUN_NPROC_LIMIT = int(os.getenv("RUN_NPROC_LIMIT", 256))
+SANDBOX_PATH = ["/usr/local/bin", "/usr/bin", "/bin"]
+
+# bubblewrap gives every compile/run fresh pid, net, ipc and user namespaces
+# and a filesystem made only of the system dirs below plus its own work dir:
+# no app directory (.env, uploads/), no /proc of the server. A root server
+# additionally drops to RUN_SANDBOX_UID before starting bwrap.
+SANDBOX_BWRAP = shutil.which(os.getenv("SANDBOX_BWRAP", "bwrap"))
+SANDBOX_UID = int(os.getenv("RUN_SANDBOX_UID", 65534))
+SANDBOX_GID = int(os.getenv("RUN_SANDBOX_GID", 65534))
+SANDBOX_RO_DIRS = [
+    "/usr", "/bin", "/sbin", "/lib", "/lib32", "/lib64",
+    "/etc/alternatives", "/etc/ld.so.cache", "/etc/ld.so.conf", "/etc/ld.so.conf.d",
+    *glob.glob("/etc/java*"),
+    *[d for d in os.getenv("RUN_SANDBOX_BINDS", "").split(os.pathsep) if d]
+]
+
+COMPILED_LANGUAGES = {
+    "c": {"compiler": "gcc", "source": "main.c", "flags": ["-O2", "-std=c11", "-lm"]},
+    "cpp": {"compiler": "g++", "source": "main.cpp", "flags": ["-O2", "-std=c++17"]},
+    "java": {"compiler": "javac", "launcher": "java", "source": "Main.java", "flags": ["-encoding", "UTF-8", "-J-Xmx512m"]},
+}
+
+_compiler_versions = {}
+
+
+def _compiler_version(compiler):
+    if compiler not in _compiler_versions:
+        try:
+            out = subprocess.run([compiler, "--version" if compiler != "javac" else "-version"],
+                                 capture_output=True, text=True, timeout=10)
+            _compiler_versions[compiler] = (out.stdout or out.stderr).splitlines()[0].strip()
+        except (OSError, IndexError, subprocess.SubprocessError):
+            _compiler_versions[compiler] = "unknown"
+    return _compiler_versions[compiler]
+
+
+def sandbox_env(home):
+    """
+    Environment for toolchains and student code: only a PATH that reaches the
+    local toolchains, never the server's variables (MONGO_URI, API keys...).
+    """
+    tool_dirs = [
+        os.path.dirname(path)
+        for path in (shutil.which(tool) for tool in ("gcc", "g++", "javac", "java"))
+        if path
+    ]
+    return {
+        "PATH": os.pathsep.join(dict.fromkeys(tool_dirs + SANDBOX_PATH)),
+        "HOME": home,
+        "LANG": "C.UTF-8"
+    }
+
+
+def sandbox_command(cmd, workdir, ro_binds=(), as_pid_1=False):
+    """
+    `cmd` wrapped in bwrap, with `workdir` mounted writable at /work (also the
+    cwd and HOME) and each (src, dest) of `ro_binds` mounted read-only.
+    """
+    args = [SANDBOX_BWRAP, "--unshare-all", "--die-with-parent", "--new-session", "--cap-drop", "ALL"]
+    for path in SANDBOX_RO_DIRS:
+        args += ["--ro-bind-try", path, path]
+    for src, dest in ro_binds:
+        args += ["--ro-bind", src, dest]
+    args += ["--proc", "/proc", "--dev", "/dev", "--tmpfs", "/tmp",
+             "--bind", workdir, "/work", "--chdir", "/work"]
+    if as_pid_1:
+        args.append("--as-pid-1")
+    return args + ["--", *cmd]
+
+
+def sandbox_user():
+    """subprocess kwargs dropping a root server to the sandbox uid (empty otherwise)."""
+    if not hasattr(os, "geteuid") or os.geteuid() != 0:
+        return {}
+    return {"user": SANDBOX_UID, "group": SANDBOX_GID, "extra_groups": []}
+
+
+def hand_to_sandbox(path):
+    """Lets the sandbox uid write to a directory created by a root server."""
+    if sandbox_user():
+        os.chown(path, SANDBOX_UID, SANDBOX_GID)
+
+
+def _limit_child_resources(memory_bytes=None, cpu_seconds=RUN_TIMEOUT):
+    """preexec_fn for sandboxed children (no-op where `resource` is missing)."""
+    def apply():
+        if resource is None:
+            return
+        os.setsid()
+        resource.setrlimit(resource.RLIMIT_NPROC, (RUN_NPROC_LIMIT, RUN_NPROC_LIMIT))
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (RUN_OUTPUT_LIMIT, RUN_OUTPUT_LIMIT))
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        if memory_bytes:
+            resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    return apply if resource is not None else None
+
+
+class CompileCache:
+    """
+    Size-bounded LRU of compiled artifacts on local disk, one directory per
+    key. Shared by all worker threads; a per-key lock makes concurrent runs of
+    the same source wait for a single compile instead of racing. get()/put()
+    pin the entry until release(), and pinned entries are never evicted, so
+    an artifact cannot disappear while it is being executed.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()   # key -> size in bytes
+        self.total = 0
+        self._key_locks = {}           # key -> [lock, threads using it]
+        self._pins = Counter()
+        os.makedirs(self.root, exist_ok=True)
+
+        # Re-adopt artifacts left by a previous process, oldest first
+        existing = []
+        for key in os.listdir(self.root):
+            path = os.path.join(self.root, key)
+            if os.path.isdir(path) and not key.startswith("."):
+                existing.append((os.path.getmtime(path), key, self._dir_size(path)))
+        for _, key, size in sorted(existing):
+            self.entries[key] = size
+            self.total += size
+
+    @staticmethod
+    def _dir_size(path):
+        return sum(
+            os.path.getsize(os.path.join(d, f))
+            for d, _, files in os.walk(path) for f in files
+        )
+
+    @contextmanager
+    def key_lock(self, key):
+        """Serialises compiles of one key; the lock is dropped once unused."""
+        with self.lock:
+            slot = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            slot[1] += 1
+        try:
+            with slot[0]:
+                yield
+        finally:
+            with self.lock:
+                slot[1] -= 1
+                if not slot[1]:
+                    del self._key_locks[key]
+
+    def get(self, key):
+        """Pinned path of a cached artifact, or None."""
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            self._pins[key] += 1
+        path = os.path.join(self.root, key)
+        try:
+            os.utime(path)
+        except OSError:
+            self.discard(key)
+            return None
+        return path
+
+    def release(self, key):
+        with self.lock:
+            self._pins[key] -= 1
+            if self._pins[key] <= 0:
+                del self._pins[key]
+
+    def discard(self, key):
+        """Drops (and unpins) an entry whose files turned out to be unusable."""
+        with self.lock:
+            self.total -= self.entries.pop(key, 0)
+            self._pins.pop(key, None)
+        shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+
+    def put(self, key, build_dir):
+        path = os.path.join(self.root, key)
+        size = self._dir_size(build_dir)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(build_dir, path)
+
+        evicted = []
+        with self.lock:
+            self.total -= self.entries.pop(key, 0)
+            self.entries[key] = size
+            self.total += size
+            self._pins[key] += 1
+            for old_key in list(self.entries):
+                if self.total <= self.max_bytes:
+                    break
+                if self._pins[old_key]:
+                    continue  # running right now; evicted by a later put()
+                self.total -= self.entries.pop(old_key)
+                evicted.append(old_key)
+        for old_key in evicted:
+            shutil.rmtree(os.path.join(self.root, old_key), ignore_errors=True)
+        return path
+
+
+_compile_cache = None
+_compile_cache_lock = threading.Lock()
+
+
+def get_compile_cache():
+    global _compile_cache
+    with _compile_cache_lock:
+        if _compile_cache is None:
+            _compile_cache = CompileCache(COMPILE_CACHE_DIR, COMPILE_CACHE_MAX_BYTES)
+        return _compile_cache
+
+
+def local_compile_available(language):
+    spec = COMPILED_LANGUAGES.get(language)
+    if not (LOCAL_COMPILE_ENABLED and spec and SANDBOX_BWRAP):
+        return False
+    return all(shutil.which(tool) for tool in (spec["compiler"], spec.get("launcher")) if tool)
+
+
+def _java_main_class(code):
+    match = re.search(r"public\s+(?:final\s+)?class\s+(\w+)", code)
+    return match.group(1) if match else "Main"
+
+
+def compile_and_run(language, code, stdin=""):
+    """
+    Compile stage (cached) followed by the run stage. Returns a dict shaped
+    like the /api/run responses plus compile_cache: "hit" | "miss".
+    """
+    spec = COMPILED_LANGUAGES[language]
+    source_name = spec["source"]
+    if language == "java":
+        source_name = f"{_java_main_class(code)}.java"
+
+    cache = get_compile_cache()
+    key = hashlib.sha256("\0".join(
+        [language, _compiler_version(spec["compiler"]), " ".join(spec["flags"]), source_name, code]
+    ).encode("utf-8")).hexdigest()
+
+    compile_ms = 0
+    with cache.key_lock(key):
+        artifact_dir = cache.get(key)
+        cache_status = "hit" if artifact_dir else "miss"
+        if not artifact_dir:
+            build_dir = tempfile.mkdtemp(prefix=".build-", dir=cache.root)
+            try:
+                hand_to_sandbox(build_dir)
+                with open(os.path.join(build_dir, source_name), "w", encoding="utf-8") as f:
+                    f.write(code)
+                if language == "java":
+                    cmd = [spec["compiler"], *spec["flags"], "-d", ".", source_name]
+                    memory = None  # javac is a JVM; its heap is capped by -J-Xmx
+                else:
+                    # linker flags such as -lm must follow the source file
+                    cmd = [spec["compiler"], source_name, "-o", "main", *spec["flags"]]
+                    memory = COMPILE_MEMORY_LIMIT
+
+                started = time.monotonic()
+                try:
+                    proc = subprocess.run(sandbox_command(cmd, build_dir), cwd=build_dir,
+                                          capture_output=True, text=True, timeout=COMPILE_TIMEOUT,
+                                          env=sandbox_env("/work"), **sandbox_user(),
+                                          preexec_fn=_limit_child_resources(memory, COMPILE_TIMEOUT))
+                except subprocess.TimeoutExpired:
+                    return {"error": "Compilation timed out", "compile_cache": cache_status}
+                except OSError as e:
+                    return {"error": "Compiler unavailable", "detail": str(e), "compile_cache": cache_status}
+                compile_ms = int((time.monotonic() - started) * 1000)
+
+                if proc.returncode != 0:
+                    return {"error": "Compilation Error", "detail": proc.stderr or proc.stdout,
+                            "compile_cache": cache_status, "compile_ms": compile_ms}
+                artifact_dir = cache.put(key, build_dir)
+            finally:
+                shutil.rmtree(build_dir, ignore_errors=True)
+
+    try:
+        if language == "java":
+            cmd = [spec["launcher"], "-Xmx256m", "-cp", "/artifact", source_name[:-len(".java")]]
+            memory = None  # the JVM reserves far more address space than it uses
+        else:
+            cmd = ["/artifact/main"]
+            memory = RUN_MEMORY_LIMIT
+
+        started = time.monotonic()
+        with tempfile.TemporaryDirectory() as workdir:
+            hand_to_sandbox(workdir)
+            try:
+                proc = subprocess.run(sandbox_command(cmd, workdir, [(artifact_dir, "/artifact")]),
+                                      cwd=workdir, input=stdin or "", capture_output=True, text=True,
+                                      timeout=RUN_TIMEOUT, env=sandbox_env("/work"), **sandbox_user(),
+                                      preexec_fn=_limit_child_resources(memory))
+            except subprocess.TimeoutExpired:
+                return {"error": "Time limit exceeded", "detail": f"Run exceeded {RUN_TIMEOUT}s",
+                        "compile_cache": cache_status, "compile_ms": compile_ms}
+            except OSError as e:
+                # artifact removed behind our back: drop it so the next run recompiles
+                if not os.path.isdir(artifact_dir):
+                    cache.discard(key)
+                return {"error": "Execution failed", "detail": str(e),
+                        "compile_cache": cache_status, "compile_ms": compile_ms}
+        run_ms = int((time.monotonic() - started) * 1000)
+    finally:
+        cache.release(key)
+
+    stdout = proc.stdout[:RUN_OUTPUT_LIMIT]
+    stderr = proc.stderr[:RUN_OUTPUT_LIMIT]
+    output = stdout.strip() or stderr or "(no output)"
+    if proc.returncode != 0 and stderr and stdout:
+        output = f"{stdout.rstrip()}\n{stderr}"
+
+    return {"output": output, "exit_code": proc.returncode, "compile_cache": cache_status,
+            "compile_ms": compile_ms, "run_ms": run_ms}
+
+
+# -----------------------
+# Warm Python fork-server pool
+# -----------------------
+# Opt-in with PYTHON_POOL_SIZE > 0 (Linux with bwrap). Each pool member is a
+# long-lived interpreter that has already imported PYTHON_POOL_PRELOAD; for
+# every run it forks a fresh child with resource limits, so user code starts
+# without paying interpreter startup or the numpy/pandas import cost.
+#
+# Forked runs share the server's uid, so the server itself lives in a bwrap
+# sandbox (see sandbox_command) as pid 1 of its own pid namespace: runs see
+# neither the app directory nor the web process. The server is non-dumpable,
+# which keeps runs out of /proc/1/fd (its job/result pipes), and after each
+# run it kills every other process in the namespace and wipes the writable
+# dirs, so nothing survives into the next user's run. Results carry the job's
+# nonce and are read with a deadline.
+import queue
+import select
+
+PYTHON_POOL_SIZE = int(os.getenv("PYTHON_POOL_SIZE", 0)) if hasattr(os, "fork") else 0
+if PYTHON_POOL_SIZE and not SANDBOX_BWRAP:
+    print("Python pool disabled: bwrap not found")
+    PYTHON_POOL_SIZE = 0
+PYTHON_POOL_PRELOAD = [m for m in os.getenv("PYTHON_POOL_PRELOAD", "numpy,pandas").split(",") if m.strip()]
+PYTHON_POOL_EXECUTABLE = os.getenv("PYTHON_POOL_EXECUTABLE", sys.executable)
+PYTHON_POOL_MAX_JOBS = 200          # recycle a server after this many runs
+PYTHON_POOL_WAIT = 2                # seconds to wait for a free server
+PYTHON_POOL_START_TIMEOUT = 60      # preloading numpy/pandas can be slow
+PYTHON_RUN_MEMORY_LIMIT = 1024 * 1024 * 1024
+
+FORK_SERVER_SOURCE = r"""
+import ctypes, importlib, json, os, resource, shutil, signal, sys, tempfile, time, traceback
+
+for name in sys.argv[1:]:
+    try:
+        importlib.import_module(name.strip())
+    except Exception:
+        pass
+
+# Runs share our uid: non-dumpable keeps them out of /proc/<us>/fd and
+# environ, and as pid 1 a signal with the default disposition sent from
+# inside the namespace (even SIGKILL) is ignored.
+IN_SANDBOX = os.getpid() == 1
+try:
+    ctypes.CDLL(None, use_errno=True).prctl(4, 0, 0, 0, 0)  # PR_SET_DUMPABLE, 0
+except (AttributeError, OSError):
+    pass
+signal.signal(signal.SIGINT, signal.SIG_DFL)
+SCRATCH_DIRS = ("/tmp", "/work", "/dev/shm")
+
+
+def wipe(path):
+    for name in os.listdir(path):
+        entry = os.path.join(path, name)
+        try:
+            if os.path.isdir(entry) and not os.path.islink(entry):
+                os.chmod(entry, 0o700)
+                wipe(entry)
+                os.rmdir(entry)
+            else:
+                os.remove(entry)
+        except OSError:
+            pass
+
+
+def kill_leftovers(pid):
+    if IN_SANDBOX:
+        try:
+            os.kill(-1, signal.SIGKILL)  # everything in our pid namespace but us
+        except OSError:
+            pass
+        while True:
+            try:
+                os.waitpid(-1, 0)
+            except ChildProcessError:
+                break
+    else:
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+
+out = sys.stdout
+out.write("ready\n")
+out.flush()
+
+for line in sys.stdin:
+    job = json.loads(line)
+    started = time.monotonic()
+    workdir = tempfile.mkdtemp()
+    try:
+        paths = {k: os.path.join(workdir, "." + k) for k in ("stdin", "stdout", "stderr")}
+        with open(paths["stdin"], "w", encoding="utf-8") as f:
+            f.write(job.get("stdin") or "")
+
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                os.setsid()
+                os.chdir(workdir)
+                os.environ["HOME"] = workdir
+                os.dup2(os.open(paths["stdin"], os.O_RDONLY), 0)
+                os.dup2(os.open(paths["stdout"], os.O_WRONLY | os.O_CREAT), 1)
+                os.dup2(os.open(paths["stderr"], os.O_WRONLY | os.O_CREAT), 2)
+                os.closerange(3, resource.getrlimit(resource.RLIMIT_NOFILE)[0])
+                sys.stdin = open(0, encoding="utf-8", closefd=False)
+                sys.stdout = open(1, "w", encoding="utf-8", closefd=False)
+                sys.stderr = open(2, "w", encoding="utf-8", closefd=False)
+                cpu = job["cpu_seconds"]
+                resource.setrlimit(resource.RLIMIT_NPROC, (job["nproc"], job["nproc"]))
+                resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+                resource.setrlimit(resource.RLIMIT_AS, (job["memory"], job["memory"]))
+                resource.setrlimit(resource.RLIMIT_FSIZE, (job["output_limit"], job["output_limit"]))
+                resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+                exec(compile(job["code"], "main.py", "exec"), {"__name__": "__main__", "__file__": "main.py"})
+            except SystemExit as e:
+                status = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            except BaseException:
+                etype, value, tb = sys.exc_info()
+                traceback.print_exception(etype, value, tb.tb_next)  # hide the server frame
+                status = 1
+            finally:
+                try:
+                    sys.stdout.flush()
+                    sys.stderr.flush()
+                finally:
+                    os._exit(status)
+
+        timed_out = False
+        deadline = started + job["timeout"]
+        while True:
+            done, wait_status = os.waitpid(pid, os.WNOHANG)
+            if done:
+                break
+            if time.monotonic() > deadline:
+                timed_out = True
+                try:
+                    os.killpg(pid, signal.SIGKILL)
+                except OSError:
+                    pass
+                _, wait_status = os.waitpid(pid, 0)
+                break
+            time.sleep(0.002)
+
+        # kill anything the run forked, even on a clean exit
+        kill_leftovers(pid)
+
+        result = {"id": job["id"], "timed_out": timed_out, "exit_code": os.waitstatus_to_exitcode(wait_status)}
+        for key in ("stdout", "stderr"):
+            with open(paths[key], "rb") as f:
+                result[key] = f.read(job["output_limit"]).decode("utf-8", errors="replace")
+        result["run_ms"] = int((time.monotonic() - started) * 1000)
+    finally:
+        if IN_SANDBOX:
+            for scratch in SCRATCH_DIRS:
+                if os.path.isdir(scratch):
+                    wipe(scratch)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    out.write(json.dumps(result) + "\n")
+    out.flush()
+"""
+
+
+def _python_sandbox_binds():
+    """Read-only (src, dest) binds exposing the pool interpreter and its site-packages."""
+    app_dir = os.path.abspath(app.root_path)
+    dirs = [sys.prefix, sys.base_prefix, os.path.dirname(os.path.realpath(PYTHON_POOL_EXECUTABLE))]
+    binds = []
+    for path in dict.fromkeys(os.path.abspath(d) for d in dirs):
+        covered = any(path == d or path.startswith(d + "/")
+                      for d in SANDBOX_RO_DIRS + [src for src, _ in binds])
+        # never bind a parent of the app directory (that would expose .env)
+        if covered or app_dir == path or app_dir.startswith(path + "/") or not os.path.isdir(path):
+            continue
+        binds.append((path, path))
+    return binds
+
+
+class PythonForkServer:
+    def __init__(self):
+        self.jobs = 0
+        self.buffer = b""
+        self.workdir = tempfile.mkdtemp(prefix="pyfork-")
+        hand_to_sandbox(self.workdir)
+        cmd = [PYTHON_POOL_EXECUTABLE, "-c", FORK_SERVER_SOURCE, *PYTHON_POOL_PRELOAD]
+        self.proc = subprocess.Popen(
+            sandbox_command(cmd, self.workdir, _python_sandbox_binds(), as_pid_1=True),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            cwd=self.workdir, env=sandbox_env("/work"), **sandbox_user()
+        )
+        try:
+            ready = self._read_line(PYTHON_POOL_START_TIMEOUT)
+        except RuntimeError:
+            ready = None
+        if ready != "ready":
+            self.close()
+            raise RuntimeError("Python fork server failed to start")
+
+    def alive(self):
+        return self.proc.poll() is None
+
+    def _read_line(self, timeout):
+        deadline = time.monotonic() + timeout
+        fd = self.proc.stdout.fileno()
+        while b"\n" not in self.buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                raise RuntimeError("Python fork server did not answer in time")
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise RuntimeError("Python fork server exited")
+            self.buffer += chunk
+        line, _, self.buffer = self.buffer.partition(b"\n")
+        return line.decode("utf-8")
+
+    def run(self, code, stdin):
+        self.jobs += 1
+        nonce = uuid.uuid4().hex
+        self.proc.stdin.write(json.dumps({
+            "id": nonce,
+            "code": code,
+            "stdin": stdin,
+            "timeout": RUN_TIMEOUT,
+            "cpu_seconds": RUN_TIMEOUT,
+            "memory": PYTHON_RUN_MEMORY_LIMIT,
+            "nproc": RUN_NPROC_LIMIT,
+            "output_limit": RUN_OUTPUT_LIMIT
+        }).encode("utf-8") + b"\n")
+        self.proc.stdin.flush()
+        # the server enforces RUN_TIMEOUT itself; the slack covers cleanup
+        result = json.loads(self._read_line(RUN_TIMEOUT + 5))
+        if result.get("id") != nonce:
+            raise RuntimeError("Python fork server answered for another job")
+        return result
+
+    def close(self):
+        try:
+            self.proc.kill()
+            self.proc.wait(timeout=5)
+        except Exception:
+            pass
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+class PythonPool:
+    """Keeps `size` warm fork servers; replacements are started in the background."""
+
+    def __init__(self, size):
+        self.size = size
+        self.idle = queue.Queue()
+        self.lock = threading.Lock()
+        self.count = 0     # servers alive or being started
+
+    def fill(self):
+        while True:
+            with self.lock:
+                if self.count >= self.size:
+                    return
+                self.count += 1
+            try:
+                server = PythonForkServer()
+            except Exception as e:
+                with self.lock:
+                    self.count -= 1
+                print("Python pool spawn failed:", e)
+                return
+            self.idle.put(server)
+
+    def _retire(self, server):
+        server.close()
+        with self.lock:
+            self.count -= 1
+        socketio.start_background_task(self.fill)
+
+    def run(self, code, stdin=""):
+        """Runs on a warm server; None when no server became free in time."""
+        try:
+            server = self.idle.get(timeout=PYTHON_POOL_WAIT)
+        except queue.Empty:
+            socketio.start_background_task(self.fill)
+            return None
+
+        try:
+            result = server.run(code, stdin)
+        except (OSError, ValueError, RuntimeError):
+            self._retire(server)
+            return None
+
+        if server.alive() and server.jobs < PYTHON_POOL_MAX_JOBS:
+            self.idle.put(server)
+        else:
+            self._retire(server)
+        return result
+
+
+python_pool = PythonPool(PYTHON_POOL_SIZE) if PYTHON_POOL_SIZE > 0 else None
+
+
+def run_python_warm(code, stdin=""):
+    """api_run response for the warm pool, or None to fall back to Piston."""
+    result = python_pool.run(code, stdin)
+    if result is None:
+        return None
+    if result["timed_out"]:
+        return {"error": "Time limit exceeded", "detail": f"Run exceeded {RUN_TIMEOUT}s",
+                "runner": "warm-pool"}
+
+    stdout, stderr = result["stdout"], result["stderr"]
+    output = stdout.strip() or stderr or "(no output)"
+    if result["exit_code"] != 0 and stderr and stdout:
+        output = f"{stdout.rstrip()}\n{stderr}"
+    return {"output": output, "exit_code": result["exit_code"], "runner": "warm-pool",
+            "run_ms": result["run_ms"]}
+
+
+def benchmark_python_runs(code, rounds=5):
+    """Wall-clock ms per run: fresh interpreter (cold) vs warm pool."""
+    cold = []
+    cold_timeouts = 0
+    for _ in range(rounds):
+        started = time.monotonic()
+        try:
+            subprocess.run([PYTHON_POOL_EXECUTABLE, "-c", code], capture_output=True, timeout=RUN_TIMEOUT * 3)
+        except subprocess.TimeoutExpired:
+            cold_timeouts += 1
+            continue
+        cold.append((time.monotonic() - started) * 1000)
+
+    warm = []
+    for _ in range(rounds):
+        started = time.monotonic()
+        if python_pool.run(code) is None:
+            continue
+        warm.append((time.monotonic() - started) * 1000)
+
+    def summary(samples):
+        if not samples:
+            return None
+        samples = sorted(samples)
+        return {"runs": len(samples), "median_ms": round(samples[len(samples) // 2], 1),
+                "min_ms": round(samples[0], 1), "max_ms": round(samples[-1], 1)}
+
+    return {"code": code, "cold": summary(cold), "warm": summary(warm), "cold_timeouts": cold_timeouts}
+
+
+# -----------------------
+# Runtime package availability index + import scan
+# -----------------------
+# Each execution runtime is probed once for the modules it can import; the
+# result is cached in memory and in package_index_coll and refreshed every
+# PACKAGE_INDEX_TTL. api_run scans imports statically and rejects runs that
+# need a module the runtime does not have, before anything is dispatched.
+import ast
+import json
+
+PISTON_EXECUTE_URL = "https://emkc.org/api/v2/piston/execute"
+PACKAGE_INDEX_TTL = int(os.getenv("PACKAGE_INDEX_TTL", 6 * 3600))
+
+package_index_coll = db.package_index
+
+# install names that differ from what the code imports
+PACKAGE_IMPORT_NAMES = {
+    "python": {
+        "scikit-learn": "sklearn",
+        "opencv-python": "cv2",
+        "beautifulsoup4": "bs4",
+        "pillow": "PIL",
+    },
+    "java": {
+        "spring-boot-starter-web": "org.springframework.web",
+        "spring-boot-starter-data-jpa": "org.springframework.data.jpa",
+        "mysql-connector-java": "com.mysql",
+    },
+}
+
+PACKAGE_PROBES = {
+    "python": ("python3", "main.py", """
+import json, pkgutil, sys
+names = set(sys.builtin_module_names) | {m.name for m in pkgutil.iter_modules()}
+print(json.dumps(sorted(names)))
+"""),
+    "javascript": ("nodejs", "main.js", """
+const fs = require('fs'), path = require('path'), Module = require('module');
+const names = new Set(Module.builtinModules);
+for (const dir of (module.paths || []).concat(Module.globalPaths || [])) {
+  let entries = [];
+  try { entries = fs.readdirSync(dir); } catch (e) { continue; }
+  for (const n of entries) {
+    if (!n.startsWith('@')) { names.add(n); continue; }
+    try { fs.readdirSync(path.join(dir, n)).forEach(s => names.add(n + '/' + s)); } catch (e) {}
+  }
+}
+console.log(JSON.stringify([...names].sort()));
+"""),
+    "java": ("java", "Main.java", """
+import java.util.stream.Collectors;
+public class Main {
+    public static void main(String[] args) {
+        System.out.println(ModuleLayer.boot().modules().stream()
+            .flatMap(m -> m.getPackages().stream()).sorted()
+            .map(p -> "\\"" + p + "\\"").collect(Collectors.joining(",", "[", "]")));
+    }
+}
+"""),
+}
+
+_package_index = {}             # language -> {"modules": set, "probed_at": float}
+_package_index_lock = threading.Lock()
+_package_index_refreshing = set()
+_package_index_attempts = {}    # language -> last background refresh start
+PACKAGE_PROBE_RETRY = 60
+
+
+def _probe_runtime(language):
+    runtime, filename, source = PACKAGE_PROBES[language]
+    r = requests.post(PISTON_EXECUTE_URL, json={
+        "language": runtime,
+        "version": "*",
+        "files": [{"name": filename, "content": source.strip()}],
+        "stdin": "",
+        "compile_timeout": 30000,
+        "run_timeout": 30000
+    }, timeout=60)
+    stdout = (r.json().get("run") or {}).get("stdout") or ""
+    return set(json.loads(stdout.strip().splitlines()[-1]))
+
+
+def refresh_package_index(language, force=False):
+    """Loads the index from Mongo, re-probing the runtime when stale."""
+    with _package_index_lock:
+        if language in _package_index_refreshing:
+            return
+        _package_index_refreshing.add(language)
+    try:
+        doc = package_index_coll.find_one({"language": language})
+        if force or not doc or time.time() - doc.get("probed_at", 0) > PACKAGE_INDEX_TTL:
+            try:
+                modules = _probe_runtime(language)
+            except Exception as e:
+                print(f"Package probe failed for {language}:", e)
+                if not doc:
+                    return
+            else:
+                doc = {"language": language, "modules": sorted(modules), "probed_at": time.time()}
+                package_index_coll.update_one({"language": language}, {"$set": doc}, upsert=True)
+
+        with _package_index_lock:
+            _package_index[language] = {"modules": set(doc["modules"]), "probed_at": doc["probed_at"]}
+    finally:
+        with _package_index_lock:
+            _package_index_refreshing.discard(language)
+
+
+def get_package_index(language):
+    """
+    Returns the cached module set for a runtime, or None when it has not been
+    probed yet. Stale or missing entries are refreshed in the background so
+    callers never wait on the probe.
+    """
+    if language not in PACKAGE_PROBES:
+        return None
+    now = time.time()
+    with _package_index_lock:
+        entry = _package_index.get(language)
+        stale = entry is None or now - entry["probed_at"] > PACKAGE_INDEX_TTL
+        retry = now - _package_index_attempts.get(language, 0) > PACKAGE_PROBE_RETRY
+        if stale and retry:
+            _package_index_attempts[language] = now
+    if stale and retry:
+        socketio.start_background_task(refresh_package_index, language)
+    return entry["modules"] if entry else None
+
+
+def package_index_refresher():
+    while True:
+        for language in PACKAGE_PROBES:
+            refresh_package_index(language)
+        time.sleep(PACKAGE_INDEX_TTL)
+
+
+# exception types whose handler makes an import optional (try/except fallback)
+IMPORT_GUARD_EXCEPTIONS = {"ImportError", "ModuleNotFoundError", "Exception", "BaseException"}
+
+
+def _guards_imports(handler):
+    if handler.type is None:
+        return True
+    types = handler.type.elts if isinstance(handler.type, ast.Tuple) else [handler.type]
+    return any(isinstance(t, ast.Name) and t.id in IMPORT_GUARD_EXCEPTIONS for t in types)
+
+
+def _python_imports(code):
+    """Top-level modules imported by `code`, ignoring guarded (optional) imports."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return set()
+    names = set()
+
+    def visit(node, guarded):
+        if isinstance(node, ast.Try):
+            body_guarded = guarded or any(_guards_imports(h) for h in node.handlers)
+            for child in node.body:
+                visit(child, body_guarded)
+            for child in node.handlers + node.orelse + node.finalbody:
+                visit(child, guarded)
+            return
+        if not guarded:
+            if isinstance(node, ast.Import):
+                names.update(alias.name.split(".")[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                names.add(node.module.split(".")[0])
+        for child in ast.iter_child_nodes(node):
+            visit(child, guarded)
+
+    visit(tree, False)
+    return names
+
+
+# comments and string literals (JS/Java); matched left to right, so quotes
+# inside comments and comment markers inside strings are handled
+SOURCE_TOKEN_RE = re.compile(
+    r"""//[^\n]*|/\*.*?\*/|'(?:\\.|[^'\\\n])*'|"(?:\\.|[^"\\\n])*"|`(?:\\.|[^`\\])*`""",
+    re.S
+)
+JS_IMPORT_RE = re.compile(
+    r'(?:require\s*\(\s*|import\s*\(\s*|(?:import|export)\s+(?:[\w$*{}\s,]+?\s+from\s+)?)"\x00(\d+)"'
+)
+JAVA_IMPORT_RE = re.compile(r"^\s*import\s+(?:static\s+)?([\w.]+?)(?:\.\*)?\s*;", re.MULTILINE)
+
+
+def _mask_source(code):
+    """
+    Drops comments and replaces each string literal with a numbered
+    placeholder, so import patterns only match real code. Returns the masked
+    source and the literal contents.
+    """
+    literals = []
+
+    def mask(match):
+        token = match.group(0)
+        if token.startswith("/"):
+            return "\n" * token.count("\n") or " "
+        literals.append(token[1:-1])
+        return f'"\x00{len(literals) - 1}"'
+
+    return SOURCE_TOKEN_RE.sub(mask, code), literals
+
+
+def _js_imports(code):
+    masked, literals = _mask_source(code)
+    names = set()
+    for index in JS_IMPORT_RE.findall(masked):
+        spec = literals[int(index)]
+        if spec.startswith((".", "/")) or "://" in spec or "${" in spec:
+            continue
+        spec = spec[len("node:"):] if spec.startswith("node:") else spec
+        parts = spec.split("/")
+        names.add("/".join(parts[:2]) if spec.startswith("@") else parts[0])
+    return names
+
+
+def _java_imports(code):
+    masked, _ = _mask_source(code)
+    return set(JAVA_IMPORT_RE.findall(masked))
+
+
+IMPORT_SCANNERS = {
+    "python": _python_imports,
+    "javascript": _js_imports,
+    "java": _java_imports,
+}
+
+
+def _module_available(language, name, modules):
+    if language == "java":
+        # "java.util.Map.Entry" is fine if any prefix is a known package
+        parts = name.split(".")
+        return any(".".join(parts[:i]) in modules for i in range(len(parts), 0, -1))
+    return name in modules
+
+
+def find_missing_packages(language, code):
+    """Imports in `code` the runtime cannot satisfy ([] when unknown)."""
+    language = "javascript" if language == "js" else language
+    scanner = IMPORT_SCANNERS.get(language)
+    if scanner is None:
+        return []
+    modules = get_package_index(language)
+    if not modules:
+        return []
+    return sorted(n for n in scanner(code) if not _module_available(language, n, modules))
+
+
+def package_availability(language, packages):
+    """{package: True/False/None} for install names (None = not probed yet)."""
+    modules = get_package_index(language)
+    names = PACKAGE_IMPORT_NAMES.get(language, {})
+    return {
+        pkg: None if modules is None else _module_available(language, names.get(pkg, pkg), modules)
+        for pkg in packages
+    }
+
+
+# -----------------------
+# HTML / React preview bundles
+# -----------------------
+# The workspace's index.html is served with its local stylesheets and scripts
+# inlined. Bundles are cached per (project, language) with the set of files
+# they depend on, so a code_update only drops the bundle when it touches one
+# of those files. Served with an ETag so iframes and teammates revalidate.
+PREVIEW_CACHE_SIZE = 200
+PREVIEW_CSP = "sandbox allow-scripts allow-modals"
+PREVIEW_REACT_VENDOR_DIR = os.path.join("static", "vendor", "react")
+
+PREVIEW_LINK_RE = re.compile(r"<link\b[^>]*?\bhref=[\"']([^\"']+)[\"'][^>]*>", re.I)
+PREVIEW_SCRIPT_RE = re.compile(r"<script\b([^>]*?)\s*\bsrc=[\"']([^\"']+)[\"']([^>]*)>\s*</script>", re.I)
+REACT_UMD_RE = re.compile(r"https://unpkg\.com/(react|react-dom)@(\d+)/umd/(?:react|react-dom)\.development\.js")
+
+_preview_cache = OrderedDict()   # (project, language) -> {"etag", "html", "deps"}
+_preview_versions = defaultdict(int)   # bumped by every invalidation
+_preview_cache_lock = threading.Lock()
+
+
+def _script_safe(code):
+    # keep inlined code from closing its own <script> tag
+    return code.replace("</script", "<\\/script")
+
+
+def _react_build_url(match):
+    name, major = match.group(1), match.group(2)
+    vendored = f"{name}.production.min.js"
+    if os.path.isfile(os.path.join(PREVIEW_REACT_VENDOR_DIR, vendored)):
+        return f"/static/vendor/react/{vendored}"
+    return f"https://unpkg.com/{name}@{major}/umd/{name}.production.min.js"
+
+
+def build_preview_bundle(files, language):
+    """
+    Returns (html, deps) where deps are the workspace names it relies on, or
+    None when it depends on every file in the workspace.
+    """
+    by_name = {f["filename"]: f.get("code") or "" for f in files}
+    html_name = "index.html" if "index.html" in by_name else next(
+        (n for n in by_name if n.endswith(".html")), None)
+
+    if html_name is None:
+        # no page at all: wrap every stylesheet and script in a skeleton
+        css = "".join(f"<style>{c}</style>" for n, c in by_name.items() if n.endswith(".css"))
+        js = "".join(f"<script>{_script_safe(c)}</script>" for n, c in by_name.items() if n.endswith(".js"))
+        html = f"<!DOCTYPE html><html><head><meta charset=\"utf-8\">{css}</head><body>{js}</body></html>"
+        return html, None  # any file created later joins the bundle
+
+    deps = {html_name}
+
+    def local(ref):
+        name = ref.split("?", 1)[0].split("#", 1)[0]
+        name = name[2:] if name.startswith("./") else name.lstrip("/")
+        deps.add(name)  # also track missing refs so a later create_file rebuilds
+        return name if name in by_name else None
+
+    def inline_link(match):
+        tag, href = match.group(0), match.group(1)
+        if "stylesheet" not in tag.lower() or "://" in href:
+            return tag
+        name = local(href)
+        return f"<style>{by_name[name]}</style>" if name else tag
+
+    def inline_script(match):
+        before, src, after = match.groups()
+        if "://" in src:
+            return match.group(0)
+        name = local(src)
+        if not name:
+            return match.group(0)
+        return f"<script{before}{after}>{_script_safe(by_name[name])}</script>"
+
+    html = PREVIEW_LINK_RE.sub(inline_link, by_name[html_name])
+    html = PREVIEW_SCRIPT_RE.sub(inline_script, html)
+    if language == "react":
+        html = REACT_UMD_RE.sub(_react_build_url, html)
+    return html, deps
+
+
+def get_preview_bundle(project, language):
+    key = (project, language)
+    with _preview_cache_lock:
+        bundle = _preview_cache.get(key)
+        if bundle:
+            _preview_cache.move_to_end(key)
+            return bundle
+        version = _preview_versions[key]
+
+    doc = files_coll.find_one({"projectName": project, "language": language})
+    files = doc["files"] if doc else default_files_for_language(language)
+    html, deps = build_preview_bundle(files, language)
+    bundle = {"etag": hashlib.sha256(html.encode("utf-8")).hexdigest()[:32], "html": html, "deps": deps}
+
+    with _preview_cache_lock:
+        # an invalidation during the build means `files` may predate an edit;
+        # serve it to this caller but don't cache it
+        if _preview_versions[key] == version:
+            _preview_cache[key] = bundle
+            while len(_preview_cache) > PREVIEW_CACHE_SIZE:
+                _preview_cache.popitem(last=False)
+    return bundle
+
+
+def invalidate_preview(project, language, *filenames):
+    """Drops the cached bundle if it depends on any of `filenames` (or always, if none given)."""
+    if language not in ("html", "react"):
+        return
+    key = (project, language)
+    with _preview_cache_lock:
+        _preview_versions[key] += 1
+        bundle = _preview_cache.get(key)
+        if bundle and (not filenames or bundle["deps"] is None or bundle["deps"].intersection(filenames)):
+            del _preview_cache[key]
+
+
+@app.route("/preview/<projectName>/<language>/")
+def preview_bundle(projectName, language):
+    if language not in ("html", "react"):
+        return "Preview not available", 404
+
+    # Project-authored scripts: an opaque-origin sandbox keeps them off the
+    # app's origin (cookies, same-origin API calls) even when opened directly.
+    headers = {"Content-Security-Policy": PREVIEW_CSP}
+    bundle = get_preview_bundle(projectName, language)
+    if bundle["etag"] in request.if_none_match:
+        return Response(status=304, headers={"ETag": f'"{bundle["etag"]}"', **headers})
+
+    resp = Response(bundle["html"], mimetype="text/html", headers=headers)
+    resp.set_etag(bundle["etag"])
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
 # -----------------------
 # PISTON RUN API (Unlimited)
 # -----------------------
@@ -440,11 +2305,33 @@ def api_run():
     }
 
     if language in ["html", "react"]:
-        return jsonify({"html_preview": code})
+        project = data.get("projectName")
+        preview_url = url_for("preview_bundle", projectName=project, language=language) if project else None
+        return jsonify({"html_preview": code, "preview_url": preview_url})
 
     if language not in piston_map:
         return jsonify({"error": "Language not supported"}), 400
 
+    stdin = data.get("stdin", "")
+
+    if local_compile_available(language):
+        return jsonify(compile_and_run(language, code, stdin))
+
+    # Local warm interpreters have their own packages, so this runs before
+    # the Piston package check.
+    if language == "python" and python_pool is not None:
+        result = run_python_warm(code, stdin)
+        if result is not None:
+            return jsonify(result)
+
+    missing = find_missing_packages(language, code)
+    if missing:
+        return jsonify({
+            "error": "Missing packages",
+            "detail": "Not available on the execution runtime: " + ", ".join(missing),
+            "missing": missing
+        })
+
     # Build proper payload including filename — required for JavaScript stdout
     file_ext = "js" if language in ["javascript", "js"] else "py"
 
@@ -455,7 +2342,7 @@ def api_run():
         "name": f"main.{file_ext}",
         "content": code
     }],
-    "stdin": "",
+    "stdin": stdin,
     "compile_timeout": 30000,
     "run_timeout": 30000,
     "compile_memory_limit": -1,
@@ -466,7 +2353,7 @@ def api_run():
 
     try:
         r = requests.post(
-            "https://emkc.org/api/v2/piston/execute",
+            PISTON_EXECUTE_URL,
             json=payload,
             timeout=20
         )
@@ -531,29 +2418,47 @@ def api_share_file():
     if not all([usn, projectName, filename]):
         return jsonify({"success": False, "error": "Missing fields"}), 400
 
-    # save file to uploads folder
-    safe_name = secure_filename(filename)
-    os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
-    path = os.path.join(app.config["UPLOAD_FOLDER"], safe_name)
+    # save file to uploads/<project>/ (never overwrites an earlier share)
+    stored_name, path = reserve_upload_path(projectName, filename)
 
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(code)
+    code = code or ""
 
-    file_url = url_for("uploaded_file", filename=safe_name)
+    def write_code(target):
+        with open(target, "w", encoding="utf-8") as f:
+            f.write(code)
 
-    # prepare message document
+    store_reserved_upload(stored_name, path, write_code)
+
+    file_url = url_for("uploaded_file", filename=stored_name)
+
+    preview_fields = build_code_preview(filename, code)
+    blob = uploads_coll.insert_one({
+        "projectName": projectName,
+        "sender": usn,
+        "original_name": filename,
+        "stored_name": stored_name,
+        "content": code.encode("utf-8"),
+        "mimetype": "text/plain",
+        "filesize": preview_fields["code_size"]
+    })
+    file_db_id = str(blob.inserted_id)
+    _cache_message_code(file_db_id, code)
+
+    # prepare message document (preview only, full text lives in uploads_coll)
     doc = {
         "sender": usn,
         "projectName": projectName,
         "filename": filename,
-        "code": code,
         "file_url": file_url,
         "file_type": "text/plain",
+        "file_db_id": file_db_id,
         "deleted": False
     }
+    doc.update(preview_fields)
 
     inserted = messages_coll.insert_one(doc)
     doc["_id"] = str(inserted.inserted_id)
+    search_add_message(doc, code)
 
     socketio.emit("new_message", doc, room=f"{projectName}:__chat")
 
@@ -561,6 +2466,28 @@ def api_share_file():
 
 from flask import Response
 
+@app.route("/api/messages/<message_id>/code")
+def api_message_code(message_id):
+    """Full text of a shared file, cached by content hash (ETag)."""
+    try:
+        oid = ObjectId(message_id)
+    except:
+        return jsonify({"error": "Invalid ID"}), 400
+
+    msg = messages_coll.find_one({"_id": oid}, {"code": 1, "code_hash": 1, "file_db_id": 1, "deleted": 1})
+    if not msg or msg.get("deleted"):
+        return jsonify({"error": "Message not found"}), 404
+
+    etag = msg.get("code_hash")
+    if etag and etag in request.if_none_match:
+        return Response(status=304, headers={"ETag": f'"{etag}"'})
+
+    resp = Response(load_message_code(msg), mimetype="text/plain")
+    if etag:
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = "private, max-age=86400"
+    return resp
+
 @app.route("/dbfile/<file_id>")
 def download_db_file(file_id):
     try:
@@ -579,6 +2506,238 @@ def download_db_file(file_id):
             "Content-Disposition": f"attachment; filename={file_doc['original_name']}"
         }
     )
+
+# -----------------------
+# Project export / import (zip, tar)
+# -----------------------
+import io
+import tarfile
+import zipfile
+import posixpath
+from flask import stream_with_context
+
+IMPORT_MAX_ARCHIVE_BYTES = 20 * 1024 * 1024
+IMPORT_MAX_ENTRIES = 500
+IMPORT_MAX_FILE_BYTES = 1024 * 1024
+IMPORT_MAX_TOTAL_BYTES = 50 * 1024 * 1024
+IMPORT_CHUNK = 64 * 1024
+
+
+class ArchiveLimitError(Exception):
+    pass
+
+
+class _StreamSink:
+    """Write-only, non-seekable file object; the export generator drains it."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _archive_member_name(lang, filename):
+    """<lang>/<filename> as a relative path, or None if it would escape the archive root."""
+    path = posixpath.normpath(f"{lang}/{filename}".replace("\\", "/"))
+    parts = path.split("/")
+    if path.startswith("/") or ".." in parts or len(parts) < 2 or parts[0] != lang:
+        return None
+    return path
+
+
+def _project_archive_entries(project):
+    """Yields (archive path, bytes) for every workspace file and upload."""
+    for doc in files_coll.find({"projectName": project}).sort("language", 1):
+        for f in doc.get("files", []):
+            # filenames come straight from create_file/rename_file; skip any
+            # that would extract outside the target folder
+            name = _archive_member_name(doc["language"], f.get("filename") or "")
+            if name is None:
+                continue
+            yield name, (f.get("code") or "").encode("utf-8")
+
+    seen = set()
+    for up in uploads_coll.find({"projectName": project}).batch_size(16):
+        name = secure_filename(up.get("original_name") or "") or str(up["_id"])
+        if name in seen:
+            base, ext = os.path.splitext(name)
+            name = f"{base}_{up['_id']}{ext}"
+        seen.add(name)
+        yield f"uploads/{name}", up.get("content") or b""
+
+
+def _export_zip(project):
+    sink = _StreamSink()
+    # A non-seekable sink makes zipfile write data descriptors instead of
+    # seeking back, so each entry can be flushed to the client right away.
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in _project_archive_entries(project):
+            zf.writestr(name, data)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _export_tar(project):
+    sink = _StreamSink()
+    with tarfile.open(fileobj=sink, mode="w|gz") as tf:
+        for name, data in _project_archive_entries(project):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            tf.addfile(info, io.BytesIO(data))
+            yield sink.drain()
+    yield sink.drain()
+
+
+@app.route("/api/export/<projectName>")
+def api_export(projectName):
+    """Streams every language workspace + project upload as ?format=zip|tar."""
+    fmt = (request.args.get("format") or "zip").lower()
+    if fmt not in ("zip", "tar"):
+        return jsonify({"error": "Invalid format"}), 400
+    if not teams_coll.find_one({"projectName": projectName}):
+        return jsonify({"error": "Project not found"}), 404
+
+    safe = secure_filename(projectName) or "project"
+    if fmt == "zip":
+        body, mimetype, filename = _export_zip(projectName), "application/zip", f"{safe}.zip"
+    else:
+        body, mimetype, filename = _export_tar(projectName), "application/gzip", f"{safe}.tar.gz"
+
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+def _read_capped(fobj, limit):
+    chunks = []
+    size = 0
+    while True:
+        chunk = fobj.read(IMPORT_CHUNK)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > limit:
+            raise ArchiveLimitError("File too large")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _iter_archive(upload):
+    """Yields (path, file object) for regular members of a zip or tar upload."""
+    name = (upload.filename or "").lower()
+    if name.endswith(".zip"):
+        with zipfile.ZipFile(upload.stream) as zf:
+            infos = [i for i in zf.infolist() if not i.is_dir()]
+            if len(infos) > IMPORT_MAX_ENTRIES:
+                raise ArchiveLimitError("Too many entries")
+            for info in infos:
+                with zf.open(info) as fobj:
+                    yield info.filename, fobj
+    else:
+        # streaming mode: members are read sequentially, never seeked
+        with tarfile.open(fileobj=upload.stream, mode="r|*") as tf:
+            for member in tf:
+                if member.isfile():
+                    yield member.name, tf.extractfile(member)
+
+
+def _split_import_path(path):
+    path = posixpath.normpath(path.replace("\\", "/")).lstrip("/")
+    parts = path.split("/")
+    # tolerate a single wrapping folder (e.g. "<project>/python/main.py")
+    if len(parts) > 2 and parts[1] in EDITOR_LANGUAGES and parts[0] not in EDITOR_LANGUAGES:
+        parts = parts[1:]
+    if len(parts) < 2 or ".." in parts:
+        return None, None
+    return parts[0], "/".join(parts[1:])
+
+
+@app.route("/api/import/<projectName>", methods=["POST"])
+def api_import(projectName):
+    """
+    Loads a zip/tar(.gz) laid out like the export (<language>/<filename>)
+    into the project's workspaces. Files with the same name are overwritten;
+    ?mode=replace drops the existing files of every imported language first.
+    Each language is written back with a single update.
+    """
+    # Check the declared size before request.files parses (and spools) the
+    # body; chunked uploads have no length to check, so they are refused.
+    if request.content_length is None:
+        return jsonify({"error": "Content-Length required"}), 411
+    if request.content_length > IMPORT_MAX_ARCHIVE_BYTES:
+        return jsonify({"error": "Archive too large"}), 413
+    if not teams_coll.find_one({"projectName": projectName}):
+        return jsonify({"error": "Project not found"}), 404
+
+    upload = request.files.get("archive")
+    if not upload or not upload.filename:
+        return jsonify({"error": "Missing archive"}), 400
+    replace = request.args.get("mode") == "replace"
+
+    incoming = defaultdict(dict)   # language -> {filename: code}
+    skipped = []
+    count = 0
+    total = 0
+    try:
+        for path, fobj in _iter_archive(upload):
+            count += 1
+            if count > IMPORT_MAX_ENTRIES:
+                raise ArchiveLimitError("Too many entries")
+
+            lang, filename = _split_import_path(path)
+            if lang not in EDITOR_LANGUAGES:
+                skipped.append(path)
+                continue
+
+            data = _read_capped(fobj, min(IMPORT_MAX_FILE_BYTES, IMPORT_MAX_TOTAL_BYTES - total))
+            total += len(data)
+            try:
+                incoming[lang][filename] = data.decode("utf-8")
+            except UnicodeDecodeError:
+                skipped.append(path)
+    except ArchiveLimitError as e:
+        return jsonify({"error": str(e)}), 413
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+        return jsonify({"error": "Invalid archive", "detail": str(e)}), 400
+
+    imported = {}
+    for lang, new_files in incoming.items():
+        imported[lang] = len(new_files)
+        doc = files_coll.find_one({"projectName": projectName, "language": lang})
+        existing = [] if replace or not doc else doc.get("files", [])
+
+        merged = []
+        for f in existing:
+            if f["filename"] in new_files:
+                f = {"filename": f["filename"], "code": new_files.pop(f["filename"])}
+            merged.append(f)
+        merged.extend({"filename": n, "code": c} for n, c in new_files.items())
+
+        files_coll.update_one(
+            {"projectName": projectName, "language": lang},
+            {"$set": {"files": merged}},
+            upsert=True
+        )
+        search_sync_language(projectName, lang, merged)
+        invalidate_preview(projectName, lang)
+        socketio.emit("file_list", {"files": merged, "projectName": projectName, "language": lang},
+                      room=f"{projectName}:{lang}")
+
+    return jsonify({"success": True, "imported": imported, "skipped": skipped})
+
 def extract_error_line(msg):
     import re
     match = re.search(r"line (\d+)", msg)
@@ -672,18 +2831,24 @@ def install_package():
         {"$addToSet": {f"installed.{language}": pkg}}
     )
 
-    # Message to health-check installation
-    msg = (
-        f"📦 '{pkg}' added to project dependencies.\n\n"
-        "⚠ Note:\n"
-        "Piston sandbox does NOT allow installing new packages.\n"
-        "This package will work only if it is already preinstalled on Piston."
-    )
+    # Report whether the runtime can actually import it
+    available = package_availability(language, [pkg])[pkg]
+    msg = f"📦 '{pkg}' added to project dependencies.\n\n"
+    if available:
+        msg += "✅ Available on the execution runtime."
+    elif available is False:
+        msg += (
+            "⚠ Not available on the execution runtime.\n"
+            "Piston sandbox does NOT allow installing new packages, so code importing it will not run."
+        )
+    else:
+        msg += "⏳ Runtime package list is still loading; availability unknown."
 
     return jsonify({
         "output": msg,
         "language": language,
-        "package": pkg
+        "package": pkg,
+        "available": available
     })
 
 
@@ -694,8 +2859,11 @@ def list_packages():
     Returns allowed + installed packages for a project:
     {
       allowed: { python: [...], javascript: [...], java: [...] },
-      installed: { python: [...], javascript: [...], java: [...] }
+      installed: { python: [...], javascript: [...], java: [...] },
+      available: { python: { pkg: true | false | null }, ... }
     }
+    `allowed` only lists packages the runtime can import once it has been
+    probed; `available` covers allowed + installed (null = not probed yet).
     """
     data = request.json or {}
     project = (data.get("projectName") or "").strip()
@@ -706,19 +2874,116 @@ def list_packages():
     doc = project_packages_coll.find_one({"projectName": project}) or {}
 
     installed = doc.get("installed", {})
-    allowed = doc.get("allowed", DEFAULT_ALLOWED_PACKAGES)
+
+    allowed = {}
+    available = {}
+    for language, defaults in DEFAULT_ALLOWED_PACKAGES.items():
+        packages = list(dict.fromkeys(defaults + installed.get(language, [])))
+        available[language] = package_availability(language, packages)
+        allowed[language] = [p for p in defaults if available[language][p] is not False]
 
     return jsonify({
         "allowed": allowed,
-        "installed": installed
+        "installed": installed,
+        "available": available
     })
 
 
 
+# -----------------------
+# Operator profiling routes
+# -----------------------
+@app.route("/admin/profile/start", methods=["POST"])
+@operator_only
+def admin_profile_start():
+    if not PROFILER_SUPPORTED:
+        return jsonify({"error": "Profiler is not supported under gevent workers"}), 503
+    data = request.get_json(silent=True) or {}
+    try:
+        seconds = float(data.get("seconds", 10))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid seconds"}), 400
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        return jsonify({"error": f"seconds must be in (0, {PROFILE_MAX_SECONDS}]"}), 400
+
+    if not start_profile_window(seconds):
+        return jsonify({"error": "A profiling window is already running"}), 409
+    return jsonify({"success": True, "seconds": seconds})
+
+
+@app.route("/admin/profile/captures")
+@operator_only
+def admin_profile_captures():
+    with _profile_lock:
+        captures = [
+            {k: v for k, v in c.items() if k != "stacks"}
+            for c in reversed(_profile_captures)
+        ]
+        running = _profile_window is not None
+    return jsonify({"captures": captures, "window_running": running, "slow_request_ms": SLOW_REQUEST_MS})
+
+
+@app.route("/admin/profile/captures/<capture_id>")
+@operator_only
+def admin_profile_download(capture_id):
+    """Collapsed stacks, one `frame;frame;frame count` line per stack."""
+    with _profile_lock:
+        capture = next((c for c in _profile_captures if c["id"] == capture_id), None)
+        stacks = dict(capture["stacks"]) if capture else None
+    if capture is None:
+        return jsonify({"error": "Capture not found"}), 404
+
+    body = "\n".join(f"{stack} {count}" for stack, count in sorted(stacks.items())) + "\n"
+    return Response(
+        body,
+        mimetype="text/plain",
+        headers={"Content-Disposition": f"attachment; filename=profile-{capture_id}.collapsed"}
+    )
+
+
+@app.route("/admin/bench/python_pool", methods=["POST"])
+@operator_only
+def admin_bench_python_pool():
+    if python_pool is None:
+        return jsonify({"error": "Python pool disabled (set PYTHON_POOL_SIZE)"}), 400
+    data = request.get_json(silent=True) or {}
+    imports = "".join(f"import {m}\n" for m in PYTHON_POOL_PRELOAD)
+    code = data.get("code") or f"{imports}print('ok')"
+    try:
+        rounds = int(data.get("rounds", 5))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid rounds"}), 400
+    if not 1 <= rounds <= 20:
+        return jsonify({"error": "rounds must be in [1, 20]"}), 400
+    return jsonify(benchmark_python_runs(code, rounds))
+
+
+@app.route("/admin/uploads/stats")
+@operator_only
+def admin_uploads_stats():
+    with upload_tier.lock:
+        return jsonify({
+            "total_bytes": upload_tier.total,
+            "quota_bytes": upload_tier.quota,
+            "files": len(upload_tier.entries),
+            "last_sweep": upload_tier.last_sweep
+        })
+
+
+@app.route("/admin/uploads/sweep", methods=["POST"])
+@operator_only
+def admin_uploads_sweep():
+    stats = upload_tier.sweep()
+    if stats is None:
+        return jsonify({"error": "A sweep is already running"}), 409
+    return jsonify(stats)
+
+
 # -----------------------
 # Socket.IO Events
 # -----------------------
 @socketio.on("join")
+@profiled_handler("join")
 def on_join(data):
     project = data.get("projectName")
     lang = data.get("language")
@@ -732,6 +2997,7 @@ def on_join(data):
         emit("file_list", {"files": doc["files"], "projectName": project, "language": lang})
 
 @socketio.on("code_update")
+@profiled_handler("code_update")
 def on_code_update(data):
     project = data.get("projectName")
     lang = data.get("language")
@@ -739,16 +3005,21 @@ def on_code_update(data):
     code = data.get("code")
     if not project or not lang or not filename:
         return
-    files_coll.update_one(
+    result = files_coll.update_one(
         {"projectName": project, "language": lang, "files.filename": filename},
         {"$set": {"files.$.code": code}}
     )
+    # an update racing delete_file matches nothing; don't index a phantom file
+    if result.matched_count:
+        search_update_file(project, lang, filename, code)
+    invalidate_preview(project, lang, filename)
     emit("code_update", {"projectName": project, "language": lang, "filename": filename, "code": code}, room=f"{project}:{lang}", include_self=False)
 
 # -----------------------
 # File actions (CREATE, DELETE, RENAME)
 # -----------------------
 @socketio.on("create_file")
+@profiled_handler("create_file")
 def create_file(data):
     project = data.get("projectName")
     lang = data.get("language")
@@ -760,7 +3031,9 @@ def create_file(data):
     # Ensure language doc exists
     doc = files_coll.find_one({"projectName": project, "language": lang})
     if not doc:
-        files_coll.insert_one({"projectName": project, "language": lang, "files": default_files_for_language(lang)})
+        starter = default_files_for_language(lang)
+        files_coll.insert_one({"projectName": project, "language": lang, "files": starter})
+        search_sync_language(project, lang, starter)
         doc = files_coll.find_one({"projectName": project, "language": lang})
 
     # Prevent duplicate filenames
@@ -774,11 +3047,14 @@ def create_file(data):
         {"projectName": project, "language": lang},
         {"$push": {"files": {"filename": filename, "code": code}}}
     )
+    search_update_file(project, lang, filename, code)
+    invalidate_preview(project, lang, filename)
 
     doc = files_coll.find_one({"projectName": project, "language": lang})
     emit("file_list", {"files": doc["files"], "projectName": project, "language": lang}, room=f"{project}:{lang}")
 
 @socketio.on("delete_file")
+@profiled_handler("delete_file")
 def delete_file(data):
     project = data.get("projectName")
     lang = data.get("language")
@@ -790,12 +3066,15 @@ def delete_file(data):
         {"projectName": project, "language": lang},
         {"$pull": {"files": {"filename": filename}}}
     )
+    search_remove_file(project, lang, filename)
+    invalidate_preview(project, lang, filename)
 
     doc = files_coll.find_one({"projectName": project, "language": lang})
     files = doc["files"] if doc else []
     emit("file_list", {"files": files, "projectName": project, "language": lang}, room=f"{project}:{lang}")
 
 @socketio.on("rename_file")
+@profiled_handler("rename_file")
 def rename_file(data):
     project = data.get("projectName")
     lang = data.get("language")
@@ -820,6 +3099,7 @@ def rename_file(data):
                 return
             f = {"filename": new, "code": f.get("code", "")}
             renamed = True
+            renamed_code = f["code"]
         updated.append(f)
 
     if not renamed:
@@ -831,11 +3111,24 @@ def rename_file(data):
         {"projectName": project, "language": lang},
         {"$set": {"files": updated}}
     )
+    search_remove_file(project, lang, old)
+    search_update_file(project, lang, new, renamed_code)
+    invalidate_preview(project, lang, old, new)
 
     new_doc = files_coll.find_one({"projectName": project, "language": lang})
     emit("file_list", {"files": new_doc["files"], "projectName": project, "language": lang}, room=f"{project}:{lang}")
 
 
+# -----------------------
+# Background jobs
+# -----------------------
+socketio.start_background_task(backfill_message_previews)
+socketio.start_background_task(package_index_refresher)
+socketio.start_background_task(uploads_sweeper)
+if python_pool is not None:
+    socketio.start_background_task(python_pool.fill)
+
+
 # -----------------------
 # Server Start
 # -----------------------
@@ -101,10 +101,11 @@ async function refreshInstalledPackages() {
 
   const lang = pkgLangSelect.value.toLowerCase();
   const installed = (data.installed && data.installed[lang]) || [];
+  const available = (data.available && data.available[lang]) || {};
 
   installed.forEach((pkg) => {
     const li = document.createElement("li");
-    li.textContent = pkg;
+    li.textContent = available[pkg] === false ? `${pkg} (not available on runtime)` : pkg;
     installedPkgsList.appendChild(li);
   });
 }
@@ -693,26 +694,24 @@ async function runCode() {
     return;
   }
 
-  // HTML / React preview
+  // HTML / React preview — served (and cached) by the server as one bundle
   if (language === "html" || language === "react") {
-    const htmlFile = files.find((f) => f.filename === "index.html") || fileObj;
-    const cssFile = files.find((f) => f.filename === "styles.css");
-    const jsFile =
-      files.find((f) => f.filename === "script.js") ||
-      files.find((f) => f.filename.endsWith(".js"));
-
-    const fullHtml = `
-<!doctype html><html><head>
-<meta charset="utf-8">
-${cssFile ? `<style>${cssFile.code}</style>` : ""}
-</head><body>
-${htmlFile.code}
-${jsFile ? `<script>${jsFile.code}<\/script>` : ""}
-</body></html>`;
-
-    preview.style.display = "block";
-    preview.srcdoc = fullHtml;
-    outputArea.textContent = "Preview rendered.";
+    const previewUrl = `/preview/${encodeURIComponent(project)}/${language}/`;
+    const code = editor.getValue();
+    fileObj.code = code;
+
+    // push the current file first so the bundle reflects unsaved keystrokes
+    socket.emit("code_update", {
+      projectName: project,
+      language: language,
+      filename: currentFile,
+      code
+    }, () => {
+      preview.style.display = "block";
+      // the sandboxed frame is cross-origin, so reload by re-setting src
+      preview.src = previewUrl;
+      outputArea.textContent = "Preview rendered.";
+    });
     return;
   }
 
@@ -72,6 +72,23 @@ document.addEventListener('DOMContentLoaded', () => {
       fileRow.appendChild(actions);
       bubble.appendChild(fileRow);
 
+      // Bounded preview; full file is fetched on demand
+      if (msg.code_hash) {
+        const pre = document.createElement('pre');
+        pre.className = 'code-preview';
+        pre.dataset.id = msg._id;
+        pre.textContent = msg.code || '';
+        bubble.appendChild(pre);
+
+        if (msg.code_truncated) {
+          const more = document.createElement('button');
+          more.className = 'load-full-code';
+          more.dataset.id = msg._id;
+          more.textContent = `Show full file (${msg.code_lines} lines)`;
+          bubble.appendChild(more);
+        }
+      }
+
     } else {
       // Text message
       const textRow = document.createElement('div');
@@ -146,6 +163,27 @@ document.addEventListener('DOMContentLoaded', () => {
     });
   });
 
+  // Load the full text of a shared file into its preview block
+  messagesContainer.addEventListener('click', function(e) {
+    const btn = e.target.closest('.load-full-code');
+    if (!btn) return;
+    const id = btn.dataset.id;
+    const pre = document.querySelector(`.code-preview[data-id='${id}']`);
+    if (!pre) return;
+
+    btn.disabled = true;
+    fetch(`/api/messages/${id}/code`).then(r => {
+      if (!r.ok) throw new Error(r.statusText);
+      return r.text();
+    }).then(text => {
+      pre.textContent = text;
+      btn.remove();
+    }).catch(err => {
+      console.error('Load file error', err);
+      btn.disabled = false;
+    });
+  });
+
   // copy helper for "copy text" elements if you still use them
   window.copyToClipboard = function(element) {
     const code = element.getAttribute('data-code');